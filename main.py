@@ -3,15 +3,29 @@ import os
 import logging
 from datetime import datetime
 from functools import wraps
+from itertools import chain
+from typing import Iterable
 
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_swagger_ui import get_swaggerui_blueprint
 from google.auth import exceptions
 
-from postspot.data_gateway import FirestoreGateway, NoPostNearbyError, Post, PostNotFoundError
+from postspot.data_gateway import (
+    FirestoreGateway,
+    GeoIndexUnavailableError,
+    NoPostNearbyError,
+    Post,
+    PostNotFoundError,
+)
 from postspot.config import Config
 from postspot.auth import decode_openid_token, get_token
-from postspot.constants import Environment, AccountStatus, AUTH_HEADER_NAME
+from postspot.constants import (
+    Environment,
+    AccountStatus,
+    AUTH_HEADER_NAME,
+    MAX_PAGE_SIZE,
+)
 
 # ---------------------------------------------------------------------------- #
 #                                   App init                                   #
@@ -64,21 +78,26 @@ def user_signed_up(function):
                 token_expired_t,
             ) = decode_openid_token(token)
         except exceptions.GoogleAuthError as e:
-            logger.error(f"Invalid token - issuer invalid: {e}")
+            logger.error("Invalid token - issuer invalid: %s", e)
             return jsonify({"message": "Invalid token or user not signed up"}), 401
         except ValueError as e:
-            logger.error(f"Invalid token: {e}")
+            logger.error("Invalid token: %s", e)
             return jsonify({"message": "Invalid token or user not signed up"}), 401
 
-        token_issued_at_datetime = datetime.fromtimestamp(token_issued_t)
-        token_exp_datetime = datetime.fromtimestamp(token_expired_t)
-        logger.debug(
-            f"Token issued at {token_issued_at_datetime} ({token_issued_t})"
-        )
-        logger.debug(f"Token expires at {token_exp_datetime} ({token_expired_t})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Token issued at %s (%s)",
+                datetime.fromtimestamp(token_issued_t),
+                token_issued_t,
+            )
+            logger.debug(
+                "Token expires at %s (%s)",
+                datetime.fromtimestamp(token_expired_t),
+                token_expired_t,
+            )
 
         if not data_gateway.user_exists(google_id):
-            logger.error(f"User not signed up")
+            logger.error("User not signed up")
             return jsonify({"message": "Invalid token or user not signed up"}), 401
         
         return function(google_id, *args, **kwargs)
@@ -86,6 +105,15 @@ def user_signed_up(function):
     return wrapper
 
 
+def json_response(obj, status: int = 200) -> Response:
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def generate_ndjson(items: Iterable[dict]):
+    for item in items:
+        yield orjson.dumps(item) + b"\n"
+
+
 # ---------------------------------------------------------------------------- #
 #                                   Endpoints                                  #
 # ---------------------------------------------------------------------------- #
@@ -98,10 +126,9 @@ def index():
 @app.route("/v1/posts", methods=["POST"])
 @user_signed_up
 def add_post(google_id):
-    title = request.json.get('title')
-    content = request.json.get('content')
-    longitude = float(request.json.get('longitude'))
-    latitude = float(request.json.get('latitude'))
+    body = request.get_json()
+    title, content = body.get('title'), body.get('content')
+    longitude, latitude = float(body.get('longitude')), float(body.get('latitude'))
 
     post_id = data_gateway.add_post(
         author_google_id = google_id,
@@ -116,22 +143,49 @@ def add_post(google_id):
 @app.route("/v1/posts/<post_id>", methods=["GET"])
 def read_post(post_id: str):
     try:
-        return data_gateway.read_post(post_id)
+        return json_response(data_gateway.read_post(post_id))
     except PostNotFoundError:
         return jsonify({"message": f"No post with {post_id=} found"}), 404
 
 @app.route('/v1/posts/<float(signed=True):longitude>/<float(signed=True):latitude>', methods=['GET'])
 def get_posts_nearby(longitude: float, latitude: float, radius_in_kilometers: float = 0.07):
+    posts = data_gateway.get_posts_within_radius(
+        longitude, latitude, radius_in_kilometers
+    )
     try:
-        return data_gateway.get_posts_within_radius(longitude, latitude, radius_in_kilometers)
+        first_post = next(posts)
     except NoPostNearbyError:
         return jsonify({"message": f"No posts within {radius_in_kilometers} km of ({longitude=}, {latitude=})"}), 404
+    except GeoIndexUnavailableError:
+        message = "Nearby search is not available yet, try again later"
+        return jsonify({"message": message}), 503
+
+    return Response(
+        stream_with_context(generate_ndjson(chain([first_post], posts))),
+        mimetype="application/x-ndjson",
+    )
 
 
 @app.route('/v1/posts', methods=['GET'])
 def get_posts_from_author():
     author_google_id = request.args.get('author')
-    return data_gateway.get_post_from_author(author_google_id)
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+
+    if limit is not None:
+        valid = limit.isascii() and limit.isdigit() and 1 <= int(limit) <= MAX_PAGE_SIZE
+        if not valid:
+            message = f"limit must be an integer between 1 and {MAX_PAGE_SIZE}"
+            return jsonify({"message": message}), 400
+        limit = int(limit)
+
+    try:
+        posts, next_cursor = data_gateway.get_post_from_author(
+            author_google_id, limit, cursor
+        )
+    except PostNotFoundError:
+        return jsonify({"message": f"Invalid cursor {cursor=}"}), 400
+    return json_response({"posts": posts, "next_cursor": next_cursor})
     
 
 if __name__ == "__main__":
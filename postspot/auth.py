@@ -1,24 +1,67 @@
 import os
 import logging
 import requests
-import re
+import hashlib
+import time
+from threading import Lock
 
 from google.oauth2 import id_token
 from google.auth import exceptions
 import google.auth.transport.requests
 from pip._vendor import cachecontrol
 
-from postspot.constants import AUTH_HEADER_NAME
+from postspot.constants import AUTH_HEADER_NAME, BEARER_PREFIX
 
 logger = logging.getLogger(__name__)
 
+# Decoded tokens are reused until shortly before they expire
+TOKEN_EXPIRY_MARGIN_SECONDS = 30
+TOKEN_CACHE_SWEEP_INTERVAL = 1000
+
+_token_cache: dict[bytes, tuple] = {}
+_token_cache_lock = Lock()
+_token_cache_inserts = 0
+
 
 def decode_openid_token(token) -> tuple:
+    global _token_cache_inserts
+
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+
+    with _token_cache_lock:
+        decoded = _token_cache.get(key)
+    if decoded and now < decoded[4] - TOKEN_EXPIRY_MARGIN_SECONDS:
+        return decoded
+
+    decoded = _decode_openid_token(token)
+
+    with _token_cache_lock:
+        _token_cache[key] = decoded
+        _token_cache_inserts += 1
+        if _token_cache_inserts % TOKEN_CACHE_SWEEP_INTERVAL == 0:
+            expired_keys = [
+                k
+                for k, v in _token_cache.items()
+                if now >= v[4] - TOKEN_EXPIRY_MARGIN_SECONDS
+            ]
+            for expired_key in expired_keys:
+                del _token_cache[expired_key]
+
+    return decoded
+
+
+def _decode_openid_token(token) -> tuple:
     request_session = requests.session()
     cached_session = cachecontrol.CacheControl(request_session)
     token_request = google.auth.transport.requests.Request(session=cached_session)
 
-    logger.debug(f"{request_session=} {cached_session=} {token_request=}")
+    logger.debug(
+        "request_session=%r cached_session=%r token_request=%r",
+        request_session,
+        cached_session,
+        token_request,
+    )
 
     try:
         id_info = id_token.verify_oauth2_token(
@@ -30,7 +73,7 @@ def decode_openid_token(token) -> tuple:
             id_token=token, request=token_request, audience="postspot-prod"
         )
         google_id = id_info.get("firebase").get("identities").get("google.com")[0]
-    logger.debug(f"{id_info=}")
+    logger.debug("id_info=%r", id_info)
     
     name = id_info.get("name")
     email = id_info.get("email")
@@ -41,8 +84,7 @@ def decode_openid_token(token) -> tuple:
 
 
 def get_token(request: requests.Request) -> str | None:
-    token = None
-    auth_header = request.headers.get(AUTH_HEADER_NAME)
-    if re.fullmatch('Bearer\s.*', auth_header):
-        token = auth_header.split()[1]
-    return token
+    auth_header = request.headers.get(AUTH_HEADER_NAME, "")
+    if auth_header.startswith(BEARER_PREFIX):
+        return auth_header[len(BEARER_PREFIX):].strip() or None
+    return None
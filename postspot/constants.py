@@ -14,3 +14,6 @@ class AccountStatus(Enum):
     SUSPENDED = 2
 
 AUTH_HEADER_NAME = "X-Forwarded-Authorization"
+BEARER_PREFIX = "Bearer "
+
+MAX_PAGE_SIZE = 1000
@@ -1,17 +1,29 @@
 from importlib.resources import contents
 import logging
+import math
+import time
 from abc import ABC, abstractmethod
-
-from geopy import Point
-from geopy.distance import geodesic
-
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from operator import attrgetter
+from threading import Lock
+from typing import NamedTuple
+
+import numpy as np
+from cachetools import TTLCache
 from google.cloud import firestore
 
+from postspot import geo
 from postspot.constants import AccountStatus
 
 
 logger = logging.getLogger(__name__)
 
+GEO_INDEX_TTL_SECONDS = 60
+GEO_INDEX_LOAD_TIMEOUT_SECONDS = 10
+
 
 # ---------------------------------------------------------------------------- #
 #                                   Interface                                  #
@@ -26,55 +38,30 @@ class NoPostNearbyError(Exception):
     def __init__(self, radius: float, longitude: float, latitude: float):
         super().__init__(f"No posts within {radius} km of ({longitude=}, {latitude=})")
 
+class GeoIndexUnavailableError(Exception):
+    def __init__(self, timeout: float):
+        super().__init__(f"Geo index could not be loaded within {timeout} s")
+
 
+_FIELDS = ("post_id", "author_google_id", "title", "content", "longitude", "latitude")
+_get_fields = attrgetter(*_FIELDS)
+
+
+@dataclass(slots=True)
 class Post:
-    def __init__(
-        self,
-        post_id: str = None,
-        author_google_id: str = None,
-        title: str = None,
-        content: str = None,
-        longitude: float = None,
-        latitude: float = None,
-    ):
-        self.post_id = post_id
-        self.author_google_id = author_google_id
-        self.title = title
-        self.content = content
-        self.longitude = longitude
-        self.latitude = latitude
+    post_id: str = None
+    author_google_id: str = None
+    title: str = None
+    content: str = None
+    longitude: float = None
+    latitude: float = None
 
     @staticmethod
     def from_dict(source):
-        return Post(
-            source.get("post_id"),
-            source.get("author_google_id"),
-            source.get("title"),
-            source.get("content"),
-            source.get("longitude"),
-            source.get("latitude"),
-        )
+        return Post(**{field: source.get(field) for field in _FIELDS})
 
     def to_dict(self) -> dict:
-        return {
-            "post_id": self.post_id,
-            "author_google_id": self.author_google_id,
-            "title": self.title,
-            "content": self.content,
-            "longitude": self.longitude,
-            "latitude": self.latitude,
-        }
-
-    def __repr__(self):
-        return f"""Post(
-    post_id={self.post_id}
-    author_google_id={self.author_google_id},
-    title={self.title},
-    content={self.content},
-    longitude={self.longitude},
-    latitude={self.latitude},
-)
-"""
+        return dict(zip(_FIELDS, _get_fields(self)))
 
 
 class DataGateway(ABC):
@@ -87,7 +74,9 @@ class DataGateway(ABC):
         pass
 
     @abstractmethod
-    def get_posts_within_radius(self, longitude: float, latitude: float, radius: float):
+    def get_posts_within_radius(
+        self, longitude: float, latitude: float, radius: float
+    ) -> Iterator[dict]:
         pass
 
     @abstractmethod
@@ -99,9 +88,88 @@ class DataGateway(ABC):
 # ---------------------------------------------------------------------------- #
 
 
+@cache
+def _firestore_client() -> firestore.Client:
+    # One client per process, so every gateway shares its gRPC channel. The client
+    # already configures keepalive pings on the channel it creates.
+    return firestore.Client()
+
+
+class _GeoIndex(NamedTuple):
+    ids: np.ndarray
+    lats: np.ndarray
+    lons: np.ndarray
+    loaded_at: float
+
+
 class FirestoreGateway(DataGateway):
     def __init__(self):
-        self._db = firestore.Client()
+        self._db = _firestore_client()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._signed_up_users = TTLCache(maxsize=10000, ttl=300)
+        self._signed_up_users_lock = Lock()
+
+        # Coordinates of all posts kept in memory for nearby searches, plus the posts
+        # added by this instance that the last load may not have seen yet
+        self._geo_index = None
+        self._geo_index_pending = []
+        self._geo_index_lock = Lock()
+        self._geo_index_refresh = self._executor.submit(self._load_geo_index)
+
+    def _load_geo_index(self):
+        started_at = time.monotonic()
+        posts_ref = self._db.collection("posts")
+        docs = list(posts_ref.select(["latitude", "longitude"]).stream())
+
+        ids = np.empty(len(docs), dtype=object)
+        lats = np.empty(len(docs), dtype=np.float64)
+        lons = np.empty(len(docs), dtype=np.float64)
+        for i, doc in enumerate(docs):
+            ids[i], lats[i], lons[i] = doc.id, doc.get("latitude"), doc.get("longitude")
+        logger.debug(f"Loaded geo index of {len(docs)} posts")
+
+        # Sorted by latitude, so that searches only scan the latitude band of their
+        # radius
+        order = np.argsort(lats)
+        with self._geo_index_lock:
+            self._geo_index = _GeoIndex(
+                ids[order], lats[order], lons[order], started_at
+            )
+            self._geo_index_pending = [
+                post for post in self._geo_index_pending if post[3] >= started_at
+            ]
+
+    def _refresh_geo_index_if_stale(self):
+        # Must be called with _geo_index_lock held
+        index = self._geo_index
+        stale = (
+            index is None
+            or time.monotonic() - index.loaded_at > GEO_INDEX_TTL_SECONDS
+        )
+        if stale and self._geo_index_refresh.done():
+            error = self._geo_index_refresh.exception()
+            if error:
+                logger.error(f"Loading geo index failed: {error}")
+            self._geo_index_refresh = self._executor.submit(self._load_geo_index)
+
+    def _current_geo_index(self) -> tuple[_GeoIndex, list[tuple]]:
+        with self._geo_index_lock:
+            self._refresh_geo_index_if_stale()
+            index = self._geo_index
+            refresh = self._geo_index_refresh
+
+        # Serve a stale index while it's refreshed, but wait for the first one
+        if index is None:
+            try:
+                refresh.result(timeout=GEO_INDEX_LOAD_TIMEOUT_SECONDS)
+            except TimeoutError as e:
+                raise GeoIndexUnavailableError(GEO_INDEX_LOAD_TIMEOUT_SECONDS) from e
+            except Exception as e:
+                logger.exception("Loading geo index failed")
+                raise GeoIndexUnavailableError(GEO_INDEX_LOAD_TIMEOUT_SECONDS) from e
+
+        with self._geo_index_lock:
+            return self._geo_index, list(self._geo_index_pending)
 
     def add_post(
         self, author_google_id: str, title: str, content: str, longitude: float, latitude: float
@@ -111,6 +179,14 @@ class FirestoreGateway(DataGateway):
         post_id = doc_ref.id
         doc_ref.set(Post(post_id, author_google_id, title, content, longitude, latitude).to_dict())
 
+        # Reloading also prunes the pending list, so it must happen even without
+        # nearby searches
+        with self._geo_index_lock:
+            self._geo_index_pending.append(
+                (post_id, latitude, longitude, time.monotonic())
+            )
+            self._refresh_geo_index_if_stale()
+
         return post_id
 
     def read_post(self, post_id: str) -> dict:
@@ -124,43 +200,88 @@ class FirestoreGateway(DataGateway):
 
         raise PostNotFoundError(post_id)
 
-    def get_posts_within_radius(self, longitude: float, latitude: float, radius: float):
+    def get_posts_within_radius(
+        self, longitude: float, latitude: float, radius: float
+    ) -> Iterator[dict]:
         logger.debug(f"Getting posts within {radius} km of ({longitude=}, {latitude=})")
-        posts = {"post": []}
+        found = False
 
-        # Convert radius from km to meters for geodesic distance calculation
+        # Convert radius from km to meters for distance calculation
         radius_meters = radius * 1000
 
-        # Create a geopy Point for the reference location
-        reference_point = Point(latitude, longitude)
-
-        # Query all posts from Firestore
-        docs = self._db.collection("posts").stream()
-
-        for doc in docs:
-            post_data = doc.to_dict()
-
-            # Create a geopy Point for each post's location
-            post_point = Point(post_data['latitude'], post_data['longitude'])
-
-            # Calculate the distance between the reference location and the post's location
-            distance = geodesic(reference_point, post_point).meters
-
-            # Check if the distance is within the specified radius
-            if distance <= radius_meters:
-                posts["post"].append(post_data)
-
-        if posts["post"]:
-            return posts
-
-        raise NoPostNearbyError(radius, longitude, latitude)
-
-    def get_post_from_author(self, author_google_id: str):
-        posts = self._db.collection("posts").where("author_google_id", "==", author_google_id).get()
-        return [post.to_dict() for post in posts]
- 
+        index, pending = self._current_geo_index()
+        lat_delta = math.degrees(radius_meters / geo.EARTH_RADIUS_METERS)
+        start = np.searchsorted(index.lats, latitude - lat_delta, side="left")
+        end = np.searchsorted(index.lats, latitude + lat_delta, side="right")
+        mask = geo.haversine_mask(
+            index.lats[start:end],
+            index.lons[start:end],
+            latitude,
+            longitude,
+            radius_meters,
+        )
+        matches = index.ids[start:end][mask].tolist()
+        if pending:
+            pending_ids, pending_lats, pending_lons, _ = zip(*pending)
+            pending_mask = geo.haversine_mask(
+                np.array(pending_lats, dtype=np.float64),
+                np.array(pending_lons, dtype=np.float64),
+                latitude,
+                longitude,
+                radius_meters,
+            )
+            matches += [
+                post_id
+                for post_id, within in zip(pending_ids, pending_mask)
+                if within
+            ]
+
+        # Fetch the full content of the matching posts only
+        if matches:
+            posts_ref = self._db.collection("posts")
+            refs = [posts_ref.document(post_id) for post_id in dict.fromkeys(matches)]
+            for doc in self._db.get_all(refs):
+                if doc.exists:
+                    found = True
+                    yield doc.to_dict()
+
+        if not found:
+            raise NoPostNearbyError(radius, longitude, latitude)
+
+    def get_post_from_author(
+        self, author_google_id: str, page_size: int = None, start_after: str = None
+    ) -> tuple[list[dict], str | None]:
+        posts_ref = self._db.collection("posts")
+        query = posts_ref.where("author_google_id", "==", author_google_id)
+
+        if start_after is not None:
+            try:
+                cursor = posts_ref.document(start_after).get()
+            except ValueError:
+                # start_after is not a valid document id, e.g. it contains a slash
+                raise PostNotFoundError(start_after)
+            if not cursor.exists:
+                raise PostNotFoundError(start_after)
+            query = query.start_after(cursor)
+        if page_size is not None:
+            query = query.limit(page_size)
+
+        posts = list(query.stream())
+        page_full = page_size is not None and len(posts) == page_size
+        next_cursor = posts[-1].id if posts and page_full else None
+        return [post.to_dict() for post in posts], next_cursor
 
     def user_exists(self, google_id: str) -> bool:
+        # Only users that exist are cached, so that users who sign up are let in
+        # right away
+        with self._signed_up_users_lock:
+            if google_id in self._signed_up_users:
+                return True
+
         doc_ref = self._db.collection("users").document(google_id)
         doc = doc_ref.get()
+
+        if doc.exists:
+            with self._signed_up_users_lock:
+                self._signed_up_users[google_id] = True
         return doc.exists
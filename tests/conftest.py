@@ -0,0 +1,98 @@
+import itertools
+import threading
+
+import pytest
+
+from postspot import data_gateway
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: dict | None):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def get(self, field: str):
+        return self._data[field]
+
+    def to_dict(self) -> dict:
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, store: dict, doc_id: str):
+        self._store = store
+        self.id = doc_id
+
+    def set(self, data: dict):
+        self._store[self.id] = dict(data)
+
+    def get(self) -> FakeSnapshot:
+        return FakeSnapshot(self.id, self._store.get(self.id))
+
+
+class FakeCollection:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+
+    def document(self, doc_id: str = None) -> FakeDocument:
+        if doc_id is None:
+            doc_id = f"post-{next(self._client.ids):04d}"
+        return FakeDocument(self._client.posts, doc_id)
+
+    def select(self, fields: list[str]) -> "FakeCollection":
+        return self
+
+    def stream(self):
+        self._client.loads += 1
+        if self._client.block is not None:
+            self._client.block.wait()
+        if self._client.error is not None:
+            raise self._client.error
+        return iter(
+            [
+                FakeSnapshot(doc_id, data)
+                for doc_id, data in list(self._client.posts.items())
+            ]
+        )
+
+
+class FakeFirestore:
+    """Just enough of firestore.Client for the posts collection of the geo index."""
+
+    def __init__(self):
+        self.posts = {}
+        self.ids = itertools.count()
+        self.loads = 0
+        self.error = None
+        self.block = None
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self)
+
+    def get_all(self, refs: list[FakeDocument]):
+        return [ref.get() for ref in refs]
+
+    def add(self, longitude: float, latitude: float) -> str:
+        doc = self.collection("posts").document()
+        doc.set(
+            data_gateway.Post(
+                doc.id, "author", "title", "content", longitude, latitude
+            ).to_dict()
+        )
+        return doc.id
+
+
+@pytest.fixture
+def firestore_client(monkeypatch) -> FakeFirestore:
+    client = FakeFirestore()
+    monkeypatch.setattr(data_gateway, "_firestore_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def blocked_firestore_client(firestore_client) -> FakeFirestore:
+    firestore_client.block = threading.Event()
+    yield firestore_client
+    # Let the stuck load finish so its executor thread exits
+    firestore_client.block.set()
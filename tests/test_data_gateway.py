@@ -0,0 +1,98 @@
+import pytest
+
+from postspot import data_gateway
+from postspot.data_gateway import (
+    FirestoreGateway,
+    GeoIndexUnavailableError,
+    NoPostNearbyError,
+)
+
+WARSAW = (21.0122, 52.2297)
+KRAKOW = (19.9450, 50.0647)
+
+
+def nearby_ids(
+    gateway: FirestoreGateway, longitude: float, latitude: float, radius: float = 0.07
+):
+    try:
+        return {
+            post["post_id"]
+            for post in gateway.get_posts_within_radius(longitude, latitude, radius)
+        }
+    except NoPostNearbyError:
+        return set()
+
+
+def test_nearby_search_uses_loaded_index(firestore_client):
+    warsaw_id = firestore_client.add(*WARSAW)
+    firestore_client.add(*KRAKOW)
+    gateway = FirestoreGateway()
+
+    assert nearby_ids(gateway, *WARSAW) == {warsaw_id}
+    assert firestore_client.loads == 1
+
+
+def test_new_post_is_found_before_next_load(firestore_client):
+    gateway = FirestoreGateway()
+    gateway._geo_index_refresh.result()
+
+    post_id = gateway.add_post("author", "title", "content", *WARSAW)
+
+    assert nearby_ids(gateway, *WARSAW) == {post_id}
+    assert firestore_client.loads == 1
+
+
+def test_stale_index_is_reloaded(firestore_client, monkeypatch):
+    gateway = FirestoreGateway()
+    gateway._geo_index_refresh.result()
+    post_id = firestore_client.add(*WARSAW)
+    assert nearby_ids(gateway, *WARSAW) == set()
+
+    monkeypatch.setattr(data_gateway, "GEO_INDEX_TTL_SECONDS", 0)
+    nearby_ids(gateway, *WARSAW)
+    gateway._geo_index_refresh.result()
+
+    assert firestore_client.loads == 2
+    assert nearby_ids(gateway, *WARSAW) == {post_id}
+
+
+def test_reload_drops_pending_posts_it_has_seen(firestore_client, monkeypatch):
+    gateway = FirestoreGateway()
+    gateway._geo_index_refresh.result()
+    post_id = gateway.add_post("author", "title", "content", *WARSAW)
+    assert len(gateway._geo_index_pending) == 1
+
+    monkeypatch.setattr(data_gateway, "GEO_INDEX_TTL_SECONDS", 0)
+    nearby_ids(gateway, *WARSAW)
+    gateway._geo_index_refresh.result()
+
+    assert gateway._geo_index_pending == []
+    assert nearby_ids(gateway, *WARSAW) == {post_id}
+
+
+def test_failed_first_load_makes_index_unavailable(firestore_client):
+    firestore_client.error = RuntimeError("permission denied")
+    gateway = FirestoreGateway()
+
+    with pytest.raises(GeoIndexUnavailableError):
+        next(gateway.get_posts_within_radius(*WARSAW, 0.07))
+
+
+def test_slow_first_load_makes_index_unavailable(blocked_firestore_client, monkeypatch):
+    monkeypatch.setattr(data_gateway, "GEO_INDEX_LOAD_TIMEOUT_SECONDS", 0.1)
+    gateway = FirestoreGateway()
+
+    with pytest.raises(GeoIndexUnavailableError):
+        next(gateway.get_posts_within_radius(*WARSAW, 0.07))
+
+
+def test_adding_posts_reloads_stale_index(firestore_client, monkeypatch):
+    gateway = FirestoreGateway()
+    gateway._geo_index_refresh.result()
+    monkeypatch.setattr(data_gateway, "GEO_INDEX_TTL_SECONDS", 0)
+
+    gateway.add_post("author", "title", "content", *WARSAW)
+    gateway._geo_index_refresh.result()
+
+    assert firestore_client.loads == 2
+    assert gateway._geo_index_pending == []
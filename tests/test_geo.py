@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+import pytest
+
+from postspot import geo
+
+
+def haversine_meters(lats, lons, lat0, lon0):
+    phi, phi0 = np.radians(lats), math.radians(lat0)
+    dlambda = np.radians(lons - lon0)
+    a = (
+        np.sin((phi - phi0) / 2) ** 2
+        + math.cos(phi0) * np.cos(phi) * np.sin(dlambda / 2) ** 2
+    )
+    return 2 * geo.EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+
+
+@pytest.mark.parametrize(
+    "lat0, lon0",
+    [
+        (0.0, 0.0),
+        (52.2297, 21.0122),
+        (-33.87, 151.21),
+        (70.0, 179.99),
+        (89.0, -45.0),
+        (-89.99, 10.0),
+    ],
+)
+@pytest.mark.parametrize("radius_m", [70.0, 1000.0, 5000.0, 9999.0, 20000.0])
+def test_haversine_mask_matches_haversine(lat0, lon0, radius_m):
+    rng = np.random.default_rng(0)
+    n = 20000
+    lat_span = math.degrees(radius_m / geo.EARTH_RADIUS_METERS) * 1.5
+    lats = np.clip(lat0 + rng.uniform(-lat_span, lat_span, n), -90, 90)
+    lon_span = min(lat_span / math.cos(math.radians(lat0)), 180)
+    lons = (lon0 + rng.uniform(-lon_span, lon_span, n) + 180) % 360 - 180
+
+    mask = geo.haversine_mask(lats, lons, lat0, lon0, radius_m)
+    distances = haversine_meters(lats, lons, lat0, lon0)
+
+    # Points may only be misclassified when they are within 0.1% of the radius
+    misclassified = mask != (distances <= radius_m)
+    assert np.all(np.abs(distances[misclassified] / radius_m - 1) < 1e-3)
+    assert mask.sum() > 0
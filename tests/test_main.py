@@ -0,0 +1,31 @@
+import importlib
+
+import pytest
+
+from postspot import data_gateway
+from postspot.data_gateway import FirestoreGateway
+
+
+@pytest.fixture
+def main(firestore_client):
+    return importlib.import_module("main")
+
+
+def test_nearby_returns_503_when_index_load_fails(main, firestore_client, monkeypatch):
+    firestore_client.error = RuntimeError("permission denied")
+    monkeypatch.setattr(main, "data_gateway", FirestoreGateway())
+
+    response = main.app.test_client().get("/v1/posts/21.0122/52.2297")
+
+    assert response.status_code == 503
+
+
+def test_nearby_returns_503_when_index_load_times_out(
+    main, blocked_firestore_client, monkeypatch
+):
+    monkeypatch.setattr(data_gateway, "GEO_INDEX_LOAD_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(main, "data_gateway", FirestoreGateway())
+
+    response = main.app.test_client().get("/v1/posts/21.0122/52.2297")
+
+    assert response.status_code == 503